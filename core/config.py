@@ -23,21 +23,30 @@ class ConfigNode:
     - 声明字段：读写，写回底层 dict
     - 未声明字段和下划线字段：仅挂载属性，不写回
     - 支持 ConfigNode 多层嵌套（lazy + cache）
+    - 自身使用 __slots__，子类可按需声明 __slots__ 以省去实例 __dict__
     """
 
+    __slots__ = ("_data", "_children")
+
     _SCHEMA_CACHE: dict[type, dict[str, type]] = {}
-    _FIELDS_CACHE: dict[type, set[str]] = {}
+    _FIELDS_CACHE: dict[type, frozenset[str]] = {}
 
     @classmethod
     def _schema(cls) -> dict[str, type]:
-        return cls._SCHEMA_CACHE.setdefault(cls, get_type_hints(cls))
+        # 每次属性读写都会经过这里，命中缓存时不能再解析类型注解
+        schema = cls._SCHEMA_CACHE.get(cls)
+        if schema is None:
+            schema = cls._SCHEMA_CACHE[cls] = get_type_hints(cls)
+        return schema
 
     @classmethod
-    def _fields(cls) -> set[str]:
-        return cls._FIELDS_CACHE.setdefault(
-            cls,
-            {k for k in cls._schema() if not k.startswith("_")},
-        )
+    def _fields(cls) -> frozenset[str]:
+        fields = cls._FIELDS_CACHE.get(cls)
+        if fields is None:
+            fields = cls._FIELDS_CACHE[cls] = frozenset(
+                k for k in cls._schema() if not k.startswith("_")
+            )
+        return fields
 
     @staticmethod
     def _is_optional(tp: type) -> bool:
@@ -65,7 +74,7 @@ class ConfigNode:
             tp = self._schema().get(key)
 
             if isinstance(tp, type) and issubclass(tp, ConfigNode):
-                children: dict[str, ConfigNode] = self.__dict__["_children"]
+                children: dict[str, ConfigNode] = self._children
                 if key not in children:
                     if not isinstance(value, MutableMapping):
                         raise TypeError(
@@ -77,9 +86,6 @@ class ConfigNode:
 
             return value
 
-        if key in self.__dict__:
-            return self.__dict__[key]
-
         raise AttributeError(key)
 
     def __setattr__(self, key: str, value: Any) -> None:
@@ -8,6 +8,8 @@ from .session import SessionCache
 
 
 class LoreEditor:
+    __slots__ = ("cfg", "lorebook", "sessions", "style")
+
     def __init__(
         self,
         config: PluginConfig,
@@ -42,6 +44,11 @@ class LoreEditor:
         await event.send(event.chain_result(chain))
         event.stop_event()
 
+    @staticmethod
+    def _args(event: AstrMessageEvent) -> list[str]:
+        """命令之后按空白切分出的参数"""
+        return event.message_str.split()[1:]
+
     # ================= 全局态命令 =================
 
     async def view_entry(self, event: AstrMessageEvent, arg: str | None = None):
@@ -54,15 +61,14 @@ class LoreEditor:
             entry = self.lorebook.get_entry(arg)
             entries = [entry] if entry else []
         else:
-            entries = self.lorebook.list_entries()
+            entries = self.lorebook.list_entries_sorted()
 
         if not entries:
             yield event.plain_result("未找到任何条目")
             return
 
-        entries = sorted(entries, key=lambda e: e.priority)
-        blocks = [e.display() for e in entries]
-        content = "\n\n\n".join(blocks)
+        # lorebook 返回的条目已按 priority 排序
+        content = "\n\n\n".join(e.display() for e in entries)
         await self.style_send(event, content)
 
     async def add_entry(self, event: AstrMessageEvent, name: str):
@@ -70,7 +76,9 @@ class LoreEditor:
         if len(name) > 10:
             yield event.plain_result("条目名称过长")
             return
-        content = event.message_str.removeprefix(f"添加条目 {name}").strip()
+        # 命令、名称之后的剩余部分即内容（保留内容自身的换行与空白）
+        parts = event.message_str.split(maxsplit=2)
+        content = parts[2].strip() if len(parts) > 2 else ""
         if not content:
             yield event.plain_result("请输入条目内容")
             return
@@ -89,7 +97,7 @@ class LoreEditor:
 
     async def delete_entry(self, event: AstrMessageEvent):
         """删除条目 <名称1> <名称2>"""
-        names = event.message_str.split()[1:]
+        names = self._args(event)
         if not names:
             yield event.plain_result("请指定要删除的条目名称")
             return
@@ -106,13 +114,13 @@ class LoreEditor:
 
     async def set_keywords(self, event: AstrMessageEvent):
         """设置触发词 <关键词|正则表达式>"""
-        parts = event.message_str.split()
-        if len(parts) < 3:
+        args = self._args(event)
+        if len(args) < 2:
             yield event.plain_result("用法：设置触发词 条目名 规则1 [规则2 ...]")
             return
 
-        name = parts[1]
-        keywords = parts[2:]
+        name = args[0]
+        keywords = args[1:]
 
         ok = self.lorebook.update_keywords(name, keywords)
         if not ok:
@@ -123,14 +131,14 @@ class LoreEditor:
 
     async def set_priority(self, event: AstrMessageEvent):
         """设置优先级 <数字>"""
-        parts = event.message_str.split()
-        if len(parts) != 3:
+        args = self._args(event)
+        if len(args) != 2:
             yield event.plain_result("用法：设置优先级 条目名 数字")
             return
 
-        name = parts[1]
+        name = args[0]
         try:
-            priority = int(parts[2])
+            priority = int(args[1])
         except ValueError:
             yield event.plain_result("优先级必须是整数")
             return
@@ -146,20 +154,13 @@ class LoreEditor:
 
     async def enable_entry(self, event: AstrMessageEvent):
         """启用条目 <名称1> <名称2>"""
-        names = event.message_str.split()[1:]
+        names = self._args(event)
         if not names:
             yield event.plain_result("用法：启用条目 名称1 [名称2 ...]")
             return
 
         umo = event.unified_msg_origin
-        ok, fail = [], []
-
-        for name in names:
-            if not self.lorebook.get_entry(name):
-                fail.append(name)
-                continue
-            self.lorebook.add_scope_to_entry(name, umo)
-            ok.append(name)
+        ok, fail = self.lorebook.bulk_add_scope(names, umo)
 
         lines = []
         if ok:
@@ -170,20 +171,13 @@ class LoreEditor:
 
     async def disable_entry(self, event: AstrMessageEvent):
         """禁用条目 <名称1> <名称2>"""
-        names = event.message_str.split()[1:]
+        names = self._args(event)
         if not names:
             yield event.plain_result("用法：禁用条目 名称1 [名称2 ...]")
             return
 
         umo = event.unified_msg_origin
-        ok, fail = [], []
-
-        for name in names:
-            if not self.lorebook.get_entry(name):
-                fail.append(name)
-                continue
-            self.lorebook.remove_scope_from_entry(name, umo)
-            ok.append(name)
+        ok, fail = self.lorebook.bulk_remove_scope(names, umo)
 
         # 同时把当前会话里已激活的也清掉，避免“禁用了但本次还在注入”
         self.sessions.remove(umo, ok)
@@ -213,8 +207,7 @@ class LoreEditor:
     async def clear_entries(self, event: AstrMessageEvent):
         """清除当前会话的某个条目，默认清除全部"""
         umo = event.unified_msg_origin
-        parts = event.message_str.split()
-        names = parts[1:]
+        names = self._args(event)
 
         if not names:
             self.sessions.clear(umo)
@@ -1,22 +1,142 @@
 # core/entry.py
 from __future__ import annotations
 
+import logging
+import math
 import random
 import re
+import sys
 import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 from typing import Any
 
 from astrbot.api import logger
 
 from .config import ConfigNode
+from .matcher import can_union, compile_cached, is_literal, min_match_len
 from .template import Template
 
+# 热路径上直接调用，省去每次对 random 模块的属性查找
+_rand = random.random
+
+# 单次消息处理期间共享的时间快照，None 表示实时取值
+_now_cv: ContextVar[float | None] = ContextVar("lore_now", default=None)
+
+
+def _now() -> float:
+    """
+    条目计时使用的当前时刻（单调时钟）
+
+    激活 / 过期 / cron 窗口只比较时间差且不落盘，
+    单调时钟不受系统校时回拨影响
+    """
+    now = _now_cv.get()
+    return time.monotonic() if now is None else now
+
+
+# 标准 5 段 cron（分 时 日 月 周），容忍首尾空白，与 str.split() 的切分一致
+_CRON_RE = re.compile(r"\s*\S+(?:\s+\S+){4}\s*")
+
+
+@contextmanager
+def time_snapshot(now: float | None = None) -> Iterator[None]:
+    """
+    冻结一次消息处理期间的当前时间
+
+    期间所有条目的过期 / 剩余时间 / cron 窗口判断共用同一个 now，
+    N 个条目只取一次系统时间
+    - now 显式指定时使用该时刻（time.monotonic() 时基）
+    - 否则沿用外层快照，没有外层快照时取一次单调时钟
+    """
+    if now is None:
+        now = _now()
+    token = _now_cv.set(now)
+    try:
+        yield
+    finally:
+        _now_cv.reset(token)
+
+
+@dataclass(frozen=True, slots=True)
+class DecisionCtx:
+    """
+    一次消息处理的判决上下文（发送者身份）
+
+    整轮判决只构造一次，逐条目传递同一对象，避免每个条目都重新打包关键字参数；
+    非空的 id 预先收集好，scope 判断直接使用
+    """
+
+    user_id: str
+    group_id: str
+    session_id: str
+    is_admin: bool
+    # 参与 scope 匹配的 id（私聊时 group_id 为空，空 id 不参与匹配）
+    ids: tuple[str, ...] = field(init=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "ids",
+            tuple(x for x in (self.user_id, self.group_id, self.session_id) if x),
+        )
+
+    @classmethod
+    def from_event(cls, event: Any) -> DecisionCtx:
+        """从消息事件中取出发送者身份"""
+        return cls(
+            user_id=event.get_sender_id(),
+            group_id=event.get_group_id(),
+            session_id=event.unified_msg_origin,
+            is_admin=event.is_admin(),
+        )
+
 
 class LoreEntry(ConfigNode):
     """
     LoreEntry 模型: 描述一个世界书的条目。
     """
 
+    # 配置字段存放于底层 dict，这里只声明运行期属性
+    __slots__ = (
+        "_template",
+        "_activated_at",
+        "_expire_at",
+        "_inject_count",
+        "_cron_fired_at",
+        "_cron_valid",
+        "_permanent",
+        "_has_wildcards",
+        "_section_title",
+        "_compiled_patterns",
+        "_literals",
+        "_union_patterns",
+        "_union_search",
+        "_extra_searches",
+        "_min_text_len",
+        "_scope_set",
+        "_display_cache",
+        # 允许调度器以弱引用持有条目
+        "__weakref__",
+    )
+    # clone() 需要逐个复制的运行期属性
+    _STATE_SLOTS = tuple(n for n in __slots__ if n != "__weakref__")
+
+    # display() 的固定版式
+    _DISPLAY_TMPL = (
+        "### 【{name}】\n"
+        "{keywords_line}"
+        "{cron_line}"
+        "| 状态 | 优先级 | 生效范围 | 生效时长 | 生效次数 | 生效概率 |\n"
+        "| ---- | ------ | -------- | -------- | -------- | -------- |\n"
+        "| {status} | {priority} | {scope} | {duration} | {times} | {probability} |\n"
+        "```\n"
+        "{content}\n"
+        "```"
+    )
+
     # ===== 配置字段 =====
     name: str
     enabled: bool
@@ -34,22 +154,83 @@ class LoreEntry(ConfigNode):
         data.setdefault("cron", "")
 
         super().__init__(data)
+        # name 是 Lorebook / 会话 / 索引各处的字典键，驻留后查找可走指针比较
+        if isinstance(self.name, str):
+            self.name = sys.intern(self.name)
+        # scope 多为少数几个群号 / "admin"，驻留后各条目共用同一份字符串
+        if self.scope:
+            self.scope = [
+                sys.intern(s) if isinstance(s, str) else s for s in self.scope
+            ]
         # 模板
         self._template = Template.from_data(data)
 
         # 本条目的激活时间，也是条目进入激发态的标志
         self._activated_at = None
 
+        # 激活时预先算好的过期时刻，永久有效为 inf
+        self._expire_at: float | None = None
+
         # 注入次数, 大于等于 times 时本条目生效周期结束
         self._inject_count = 0
 
         # cron 触发时间
         self._cron_fired_at: float | None = None
 
+        # 由配置推导出的只读标志，构造时算好，热路径直接读取
+        self._cron_valid = self._is_valid_cron(self.cron)
+        # duration <= 0 表示永久（窗口 / 生效期）
+        self._permanent = self.duration <= 0
+        # 正文不含 "{" 时不可能有通配符，注入时可直接使用原文
+        self._has_wildcards = "{" in self.content
+        # 注入 system_prompt 时的小节标题（name 不可变，构造时拼好）
+        self._section_title = f"## [{self.name}]\n"
+
         # 编译并缓存正则
         self._compiled_patterns: list[re.Pattern] = []
+        # 纯字面量关键词，直接做子串判断，不进入正则引擎
+        self._literals: list[str] = []
+        # 可合并关键词（交给 Lorebook 级多模式索引）及其并集正则
+        self._union_patterns: list[str] = []
+        self._union_search: Callable[[str], re.Match | None] | None = None
+        # 无法合并的关键词（内联标志 / 反向引用等），预先绑定 search 逐个匹配
+        self._extra_searches: list[Callable[[str], re.Match | None]] = []
+        # 任一关键词可能命中的最短文本长度，更短的文本无需匹配
+        self._min_text_len = 0
         self._compile_patterns()
 
+        # scope 的只读集合视图，用于 O(1) 权限判断，scope 变化时整体替换
+        self._scope_set: frozenset[str] = frozenset(self.scope)
+
+        # display() 缓存: (是否启用, 是否激活, 渲染结果)，配置变更时置空
+        self._display_cache: tuple[bool, bool, str] | None = None
+
+    def clone(self) -> LoreEntry:
+        """
+        复制出一个独立的条目（供会话挂载）
+
+        - 配置 dict 浅拷贝：字段值整体替换、不原地修改，浅拷贝即可与原条目隔离
+        - 编译结果 / scope 集合等派生数据只读，直接共享
+        - 运行时状态按值复制
+        比 copy.deepcopy 少了逐层递归与 memo 开销
+        """
+        new = object.__new__(type(self))
+        object.__setattr__(new, "_data", dict(self._data))
+        object.__setattr__(new, "_children", {})
+        for name in LoreEntry._STATE_SLOTS:
+            object.__setattr__(new, name, getattr(self, name))
+        return new
+
+    @staticmethod
+    def clear_pattern_cache() -> None:
+        """清空进程级正则编译缓存（插件卸载 / 重载时调用）"""
+        compile_cached.cache_clear()
+
+    @staticmethod
+    def _is_valid_cron(cron: Any) -> bool:
+        """是否为标准 5 段 cron 表达式"""
+        return isinstance(cron, str) and _CRON_RE.fullmatch(cron) is not None
+
     @property
     def template(self) -> Template:
         return self._template
@@ -77,23 +258,101 @@ class LoreEntry(ConfigNode):
     # ==================================================
 
     def _compile_patterns(self) -> None:
-        """编译正则"""
-        self._compiled_patterns.clear()
+        """
+        编译正则
+
+        - 逐个编译以定位非法关键词，_compiled_patterns 仅用于诊断
+        - 纯字面量关键词单独存放，按子串匹配
+        - 其余可合并的关键词编译为一个并集正则，匹配时只需一次扫描；
+          同时登记到 Lorebook 级多模式索引（可用时由索引统一扫描）
+        - 每次重新编译都换用新列表而非原地清空，clone() 出的副本可安全共享旧列表
+        """
+        self._compiled_patterns = []
+        self._literals = []
+        self._extra_searches = []
+        self._union_patterns = []
+        self._union_search = None
         self.keywords = [k for k in self.keywords if k.strip()]
 
         for pattern in self.keywords:
             try:
-                self._compiled_patterns.append(re.compile(pattern))
+                self._compiled_patterns.append(compile_cached(pattern))
             except re.error as e:
                 logger.warning(f"[条目:{self.name}] 正则编译失败: {pattern} ({e})")
 
+        self._min_text_len = min(
+            (min_match_len(p) for p in self._compiled_patterns), default=0
+        )
+
+        unionable: list[str] = []
+        for p in self._compiled_patterns:
+            if is_literal(p.pattern):
+                self._literals.append(p.pattern)
+            elif can_union(p):
+                unionable.append(p.pattern)
+            else:
+                self._extra_searches.append(p.search)
+
+        if not unionable:
+            return
+        try:
+            union = compile_cached("|".join(f"(?:{p})" for p in unionable))
+            self._union_search = union.search
+            self._union_patterns.extend(unionable)
+        except re.error:
+            self._extra_searches.extend(compile_cached(p).search for p in unionable)
+
+    @property
+    def section_title(self) -> str:
+        """注入 system_prompt 时的小节标题（含换行）"""
+        return self._section_title
+
+    @property
+    def has_wildcards(self) -> bool:
+        """正文是否可能包含通配符（不含则无需渲染）"""
+        return self._has_wildcards
+
+    @property
+    def literals(self) -> list[str]:
+        """纯字面量关键词（供 Lorebook 构建跨条目索引）"""
+        return self._literals
+
+    @property
+    def union_patterns(self) -> list[str]:
+        """可合并的正则关键词（供 Lorebook 构建跨条目多模式索引）"""
+        return self._union_patterns
+
+    @property
+    def has_extra_patterns(self) -> bool:
+        """是否存在无法并入多模式索引、只能逐个匹配的关键词"""
+        return bool(self._extra_searches)
+
     def _match_keywords(self, text: str) -> bool:
         """是否命中任一关键词正则"""
-        for p in self._compiled_patterns:
-            if p.search(text):
+        if len(text) < self._min_text_len:
+            return False
+        for literal in self._literals:
+            if literal in text:
+                return True
+        if self._union_search is not None and self._union_search(text):
+            return True
+        for search in self._extra_searches:
+            if search(text):
                 return True
         return False
 
+    def matched_keyword(self, text: str) -> str | None:
+        """
+        逐个查找命中的关键词（仅用于诊断日志）
+
+        热路径只关心是否命中，由 _match_keywords 一次扫描完成；
+        这里按原始顺序逐个 search，定位具体是哪个关键词
+        """
+        for p in self._compiled_patterns:
+            if p.search(text):
+                return p.pattern
+        return None
+
     # ==================================================
     # 基础状态
     # ==================================================
@@ -101,13 +360,11 @@ class LoreEntry(ConfigNode):
     @property
     def active(self) -> bool:
         """条目是否正处于激活态"""
-        if self._activated_at is None:
+        if self._expire_at is None:
             return False
 
-        now = time.time()
-
         # 判断是否过期
-        if self.duration > 0 and now > self._activated_at + self.duration:
+        if _now() > self._expire_at:
             logger.debug(f"[条目:{self.name}]  已过期")
             return False
 
@@ -123,16 +380,11 @@ class LoreEntry(ConfigNode):
     @property
     def remaining_time(self) -> float:
         """剩余有效时间（秒）"""
-        if self._activated_at is None:
+        if self._expire_at is None:
             return 0
 
-        # 永久有效
-        if self.duration <= 0:
-            return float("inf")
-
-        now = time.time()
-        end_time = self._activated_at + self.duration
-        return max(0, end_time - now)
+        # 永久有效时 _expire_at 为 inf
+        return max(0, self._expire_at - _now())
 
     @property
     def remaining_times(self) -> int | float:
@@ -155,9 +407,7 @@ class LoreEntry(ConfigNode):
     @property
     def enabled_cron(self) -> bool:
         """是否启用定时任务 (标准 5 段 cron)"""
-        if not self.enabled:
-            return False
-        return len(str(self.cron).split()) == 5
+        return self.enabled and self._cron_valid
 
     @property
     def in_cron_window(self) -> bool:
@@ -169,38 +419,24 @@ class LoreEntry(ConfigNode):
         if self._cron_fired_at is None:
             return False
 
-        # duration <= 0 表示永久窗口
-        if self.duration <= 0:
+        if self._permanent:
             return True
 
-        return time.time() <= self._cron_fired_at + self.duration
+        return _now() <= self._cron_fired_at + self.duration
 
     # ==================================================
     # 激活决策
     # ==================================================
 
-    def _allow_scope(
-        self,
-        *,
-        user_id: str,
-        group_id: str,
-        session_id: str,
-        is_admin: bool,
-    ) -> bool:
+    def allow_scope(self, ctx: DecisionCtx) -> bool:
         """scope 权限大门"""
-        if not self.scope:
+        scope_set = self._scope_set
+        if not scope_set:
             return True
 
-        for s in self.scope:
-            if s == "admin" and is_admin:
-                return True
-            if s == user_id:
-                return True
-            if s == group_id:
-                return True
-            if s == session_id:
-                return True
-        return False
+        if ctx.is_admin and "admin" in scope_set:
+            return True
+        return not scope_set.isdisjoint(ctx.ids)
 
     def _has_text_token(self, text: str | None) -> bool:
         """是否具备文本激活资格"""
@@ -217,64 +453,63 @@ class LoreEntry(ConfigNode):
             return True
         if p <= 0.0:
             return False
-        prob = random.random()
-        if prob < p:
-            logger.debug(f"[{self.name}] 概率激活成功: {prob} < {p}")
-            return True
-        return False
+        roll = _rand()
+        if roll >= p:
+            return False
+        logger.debug(f"[{self.name}] 概率判定通过: roll={roll:.3f} < p={p}")
+        return True
 
     def check_activate(
         self,
+        ctx: DecisionCtx,
         *,
         text: str,
-        user_id: str,
-        group_id: str,
-        session_id: str,
-        is_admin: bool,
+        text_hit: bool | None = None,
     ) -> bool:
         """
         统一激活判决, 在监听LLM消息时调用
             - 用于判定条目是否允许“进入 Session”
             - 不代表本次请求一定会注入
+            - ctx 为本轮判决共用的发送者身份
+            - text_hit 为 Lorebook 索引预先算出的文本命中结果，None 时自行匹配
         """
 
         # Gate 1: 总开关
         if not self.enabled:
             return False
 
-        # Gate 2: scope 权限大门
-        if not self._allow_scope(
-            user_id=user_id,
-            group_id=group_id,
-            session_id=session_id,
-            is_admin=is_admin,
-        ):
+        # Gate 2: 永远无法激活的条目（概率为 0 / 没有任何激活方式）
+        # 只做廉价的数值判断，避免为其执行正则匹配
+        if self.probability <= 0.0:
+            return False
+        if not self.enabled_keywords and not self.enabled_cron:
             return False
 
-        # Gate 3: 激活方式（满足其一即可）
-        text_hit = self._has_text_token(text)
-        cron_hit = self.in_cron_window
-        if not text_hit and not cron_hit:
+        # Gate 3: scope 权限大门
+        if not self.allow_scope(ctx):
             return False
 
         # Gate 4: 激活的概率
-        if not self._satisfy_probability():
+        # 先于文本匹配判定，被概率否决时省掉正则扫描；p >= 1 时直接放行
+        if self.probability < 1.0 and not self._satisfy_probability():
             return False
 
+        # Gate 5: 激活方式（满足其一即可）
+        if text_hit is None:
+            text_hit = self._has_text_token(text)
+        cron_hit = self.in_cron_window
+        if not text_hit and not cron_hit:
+            return False
+        if text_hit and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[条目:{self.name}] 命中关键词: {self.matched_keyword(text)}")
+
         # cron 资格只消费一次，避免在同一窗口内反复重置 duration / times
         if cron_hit and not text_hit:
             self._cron_fired_at = None
 
         return True
 
-    def allow_consume(
-        self,
-        *,
-        user_id: str,
-        group_id: str,
-        session_id: str,
-        is_admin: bool,
-    ) -> bool:
+    def allow_consume(self, ctx: DecisionCtx) -> bool:
         """
         使用阶段 scope 判定
             - 仅检查 scope + enabled + active
@@ -286,12 +521,41 @@ class LoreEntry(ConfigNode):
         if not self.active:
             return False
 
-        return self._allow_scope(
-            user_id=user_id,
-            group_id=group_id,
-            session_id=session_id,
-            is_admin=is_admin,
-        )
+        return self.allow_scope(ctx)
+
+    # ==================================================
+    # 配置修改
+    # ==================================================
+
+    def set_keywords(self, keywords: list[str]) -> None:
+        """更新触发词并重新编译正则"""
+        self.keywords = list(keywords)
+        self._compile_patterns()
+        self._display_cache = None
+
+    def set_priority(self, priority: int) -> None:
+        """更新优先级"""
+        self.priority = priority
+        self._display_cache = None
+
+    def add_scope(self, scope: str) -> bool:
+        """添加生效范围，返回是否发生变化"""
+        if scope in self._scope_set:
+            return False
+        scope = sys.intern(scope)
+        self.scope = [*self.scope, scope]
+        self._scope_set = frozenset(self.scope)
+        self._display_cache = None
+        return True
+
+    def remove_scope(self, scope: str) -> bool:
+        """移除生效范围，返回是否发生变化"""
+        if scope not in self._scope_set:
+            return False
+        self.scope = [s for s in self.scope if s != scope]
+        self._scope_set = frozenset(self.scope)
+        self._display_cache = None
+        return True
 
     # ==================================================
     # 生命周期钩子
@@ -302,7 +566,10 @@ class LoreEntry(ConfigNode):
         进入会话的唯一入口（激活发生点）
         """
         # 记录激活时间, 进入触发态
-        self._activated_at = time.time()
+        self._activated_at = _now()
+        self._expire_at = (
+            math.inf if self._permanent else self._activated_at + self.duration
+        )
 
     def on_consume(self) -> None:
         """
@@ -318,7 +585,7 @@ class LoreEntry(ConfigNode):
         """
         被 cron 触发，打开一次全局激活窗口
         """
-        self._cron_fired_at = time.time()
+        self._cron_fired_at = time.monotonic()
         logger.debug(f"[cron] 条目 {self.name} cron 已触发，等待消息激活")
 
     # ==================================================
@@ -347,12 +614,21 @@ class LoreEntry(ConfigNode):
         return f"{minutes}分"
 
     def display(self) -> str:
-        """以 Markdown 表格形式展示条目配置与运行状态"""
+        """
+        以 Markdown 表格形式展示条目配置与运行状态
+
+        结果按启用 / 激活状态缓存，仅在配置修改或状态变化时重新构建
+        """
+        enabled = self.enabled
+        active = self.active
+        cache = self._display_cache
+        if cache is not None and cache[0] == enabled and cache[1] == active:
+            return cache[2]
 
         # ===== 基础状态 =====
-        if not self.enabled:
+        if not enabled:
             status_text = "禁用"
-        elif self.active:
+        elif active:
             status_text = "生效中"
         else:
             status_text = "待触发"
@@ -368,7 +644,7 @@ class LoreEntry(ConfigNode):
         # ===== 生命周期 =====
         if self.duration == 0:
             duration_text = "永久"
-        elif self.active:
+        elif active:
             duration_text = f"剩余 {self.format_duration(self.duration)} 秒"
         else:
             duration_text = f"{self.duration} 秒"
@@ -376,47 +652,40 @@ class LoreEntry(ConfigNode):
         times_text = "不限次数" if self.times == 0 else f"{self.times} 次"
         probability_text = f"{int(self.probability * 100)}%"
 
-        lines = [f"### 【{self.name}】"]
-
-        # ===== 触发关键词（有就展示）=====
-        if self.keywords:
-            keywords_text = "  |  ".join(self.keywords)
-            lines.append(f"- 正则触发:  {keywords_text}")
-
-        # ===== 定时规则（有就展示）=====
-        if self.cron:
-            lines.append(f"- 定时触发:  {self.cron}")
-
-        lines.extend(
-            [
-                "| 状态 | 优先级 | 生效范围 | 生效时长 | 生效次数 | 生效概率 |",
-                "| ---- | ------ | -------- | -------- | -------- | -------- |",
-                f"| {status_text} | {self.priority} | {scope_text} | {duration_text} | {times_text} | {probability_text} |",
-            ]
+        # ===== 触发关键词 / 定时规则（有就展示）=====
+        keywords_line = (
+            f"- 正则触发:  {'  |  '.join(self.keywords)}\n" if self.keywords else ""
         )
-        # ===== 内容 =====
-        lines.extend(
-            [
-                "```",
-                self.content.strip(),
-                "```",
-            ]
+        cron_line = f"- 定时触发:  {self.cron}\n" if self.cron else ""
+
+        text = self._DISPLAY_TMPL.format_map(
+            {
+                "name": self.name,
+                "keywords_line": keywords_line,
+                "cron_line": cron_line,
+                "status": status_text,
+                "priority": self.priority,
+                "scope": scope_text,
+                "duration": duration_text,
+                "times": times_text,
+                "probability": probability_text,
+                "content": self.content.strip(),
+            }
         )
-
-        return "\n".join(lines)
+        self._display_cache = (enabled, active, text)
+        return text
 
     def display_remaining(self):
         """显示条目当前剩余时间和次数"""
-        parts = []
-
-        if self.duration > 0:
-            parts.append(f"剩{self.format_duration(self.remaining_time)}")
-        else:
-            parts.append("∞")
-
-        if self.times > 0:
-            parts.append(f"{self.remaining_times}次")
-        else:
-            parts.append("∞")
-
-        return f"{self.name}({'、'.join(parts)})" if parts else self.name
+        match (self.duration > 0, self.times > 0):
+            case (True, True):
+                return (
+                    f"{self.name}(剩{self.format_duration(self.remaining_time)}、"
+                    f"{self.remaining_times}次)"
+                )
+            case (True, False):
+                return f"{self.name}(剩{self.format_duration(self.remaining_time)}、∞)"
+            case (False, True):
+                return f"{self.name}(∞、{self.remaining_times}次)"
+            case _:
+                return f"{self.name}(∞、∞)"
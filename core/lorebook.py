@@ -1,15 +1,31 @@
-# core/entry.py
+# core/lorebook.py
 from __future__ import annotations
 
-from collections.abc import Callable
+import asyncio
+import bisect
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from operator import attrgetter
 from pathlib import Path
 from typing import Any
 
 from astrbot.api import logger
 
 from .config import PluginConfig
-from .entry import LoreEntry, Template
+from .entry import DecisionCtx, LoreEntry, Template, time_snapshot
 from .lorefile import LoreFile
+from .matcher import KeywordIndex
+
+_PRI = attrgetter("priority")
+
+# 用户与模板都未指定时的兜底字段值（list 字段在组装时单独兜底，避免共享同一对象）
+_FALLBACKS: dict[str, Any] = {
+    "enabled": True,
+    "cron": "",
+    "duration": 0,
+    "times": 0,
+    "probability": 1.0,
+}
 
 
 class Lorebook:
@@ -21,17 +37,35 @@ class Lorebook:
         self.cfg = config
         self.entry_map: dict[str, LoreEntry] = {}
         self.on_changed: list[Callable[[], None]] = []
+        # 跨条目的触发词索引（字面量 + 可合并正则）
+        self._keyword_index = KeywordIndex()
+        # 按 priority 升序维护的条目索引
+        self._by_priority: list[LoreEntry] = []
+        # 有序分区：(启用, 禁用, 启用且可文本触发, 启用且仅 cron 触发)
+        # 有序索引或触发方式变化时置空、按需一次遍历重建
+        self._partition: tuple[list[LoreEntry], ...] | None = None
+        # 发送者身份 (ids, is_admin) -> 其 scope 允许的 (可文本触发, 仅 cron 触发) 条目
+        # 分区重建或任一条目 scope 变化时清空
+        self._eligible: dict[
+            tuple[tuple[str, ...], bool], tuple[list[LoreEntry], list[LoreEntry]]
+        ] = {}
+        # entry_storage 的顺序是否可能与 _by_priority 不一致
+        self._order_dirty = True
+        # 批量保存：嵌套深度，及期间是否有被推迟的保存
+        self._save_suspended = 0
+        self._save_pending = False
 
     @property
     def entries(self) -> list[LoreEntry]:
         return list(self.entry_map.values())
 
     async def initialize(self):
-        if self.cfg.entry_storage:
-            names = self._register_entry(self.cfg.entry_storage)
-        else:
-            logger.debug("[lorebook] 未配置 entry_storage, 将使用默认配置")
-            names = self.load_entry_from_lorefile(self.cfg.default_lorefile)
+        with self._batch_saves():
+            if self.cfg.entry_storage:
+                names = self._register_entry(self.cfg.entry_storage)
+            else:
+                logger.debug("[lorebook] 未配置 entry_storage, 将使用默认配置")
+                names = await self.load_entry_from_lorefile(self.cfg.default_lorefile)
         logger.debug(f"已注册条目: {names}")
 
     def _register_entry(
@@ -41,6 +75,8 @@ class Lorebook:
         registered_names: list[str] = []
         need_save = False
         need_emit = False
+        # 按对象身份判断是否已在 entry_storage 中，避免逐个 dict 深比较
+        stored = {id(cfg) for cfg in self.cfg.entry_storage}
         for item in items:
             name = item.get("name")
             content = item.get("content")
@@ -51,12 +87,16 @@ class Lorebook:
                 continue
             entry = LoreEntry(item)
             self.entry_map[name] = entry
+            self._insert_sorted(entry)
             registered_names.append(entry.name)
-            if item not in self.cfg.entry_storage:
+            if id(item) not in stored:
                 self.cfg.entry_storage.append(item)
+                stored.add(id(item))
                 need_save = True
             if entry.enabled_cron:
                 need_emit = True
+        if registered_names:
+            self._rebuild_index()
         if need_emit:
             self._emit_changed()
         if need_save:
@@ -67,17 +107,102 @@ class Lorebook:
         """
         保存配置前统一兜底：
         - 按 priority 排序
-        - 同步 entries / entry_storage 顺序
+        - 同步 entries / entry_storage 顺序（顺序未变时跳过重排）
+        - 处于 _batch_saves 期间时只做标记，退出时统一保存一次
         """
-        cfg_map = {cfg["name"]: cfg for cfg in self.cfg.entry_storage}
-        sorted_entries = sorted(self.entry_map.values(), key=lambda e: e.priority)
-        self.cfg.entry_storage[:] = [cfg_map[e.name] for e in sorted_entries]
+        if self._save_suspended:
+            self._save_pending = True
+            return
+        if self._order_dirty:
+            cfg_map = {cfg["name"]: cfg for cfg in self.cfg.entry_storage}
+            self.cfg.entry_storage[:] = [cfg_map[e.name] for e in self._by_priority]
+            self._order_dirty = False
         self.cfg.save_config()
 
+    @contextmanager
+    def _batch_saves(self) -> Iterator[None]:
+        """期间的所有保存合并为退出时的一次写盘（可嵌套）"""
+        self._save_suspended += 1
+        try:
+            yield
+        finally:
+            self._save_suspended -= 1
+            if not self._save_suspended and self._save_pending:
+                self._save_pending = False
+                self._save_config()
+
+    def _insert_sorted(self, entry: LoreEntry) -> None:
+        """按 priority 插入有序索引（同优先级保持插入顺序）"""
+        i = bisect.bisect_right(self._by_priority, entry.priority, key=_PRI)
+        self._by_priority.insert(i, entry)
+        self._partition = None
+        self._order_dirty = True
+
+    def _remove_sorted(self, entry: LoreEntry) -> None:
+        """从有序索引中移除条目（二分定位到同优先级区间，再按身份查找）"""
+        seq = self._by_priority
+        lo = bisect.bisect_left(seq, entry.priority, key=_PRI)
+        hi = bisect.bisect_right(seq, entry.priority, lo, key=_PRI)
+        for i in range(lo, hi):
+            if seq[i] is entry:
+                del seq[i]
+                break
+        self._partition = None
+
+    def _discard_sorted(self, names: set[str]) -> None:
+        """批量从有序索引中移除条目（一次遍历，保持原有顺序）"""
+        self._by_priority[:] = [e for e in self._by_priority if e.name not in names]
+        self._partition = None
+
+    def _partitioned(self) -> tuple[list[LoreEntry], ...]:
+        """按启用状态 / 触发方式划分的有序条目（缓存）"""
+        if self._partition is None:
+            enabled: list[LoreEntry] = []
+            disabled: list[LoreEntry] = []
+            text_driven: list[LoreEntry] = []
+            cron_only: list[LoreEntry] = []
+            for e in self._by_priority:
+                if not e.enabled:
+                    disabled.append(e)
+                    continue
+                enabled.append(e)
+                if e.enabled_keywords:
+                    text_driven.append(e)
+                elif e.enabled_cron:
+                    cron_only.append(e)
+            self._partition = (enabled, disabled, text_driven, cron_only)
+            self._eligible.clear()
+        return self._partition
+
+    # 缓存的发送者身份上限，超出时整体清空
+    _ELIGIBLE_CACHE_SIZE = 1024
+
+    def eligible_for(self, ctx: DecisionCtx) -> tuple[list[LoreEntry], list[LoreEntry]]:
+        """
+        该发送者 scope 允许的启用条目：(可文本触发, 仅 cron 触发)，均按 priority 升序
+
+        结果按 (ids, is_admin) 缓存；返回的列表为只读视图
+        """
+        _, _, text_driven, cron_only = self._partitioned()
+        key = (ctx.ids, ctx.is_admin)
+        cached = self._eligible.get(key)
+        if cached is None:
+            if len(self._eligible) >= self._ELIGIBLE_CACHE_SIZE:
+                self._eligible.clear()
+            cached = self._eligible[key] = (
+                [e for e in text_driven if e.allow_scope(ctx)],
+                [e for e in cron_only if e.allow_scope(ctx)],
+            )
+        return cached
+
     def _emit_changed(self):
         for cb in self.on_changed:
             cb()
 
+    def _rebuild_index(self) -> None:
+        """条目或关键词变化后重建触发词索引"""
+        self._keyword_index.rebuild(self.entry_map.values())
+
     # ================= 查询接口 =================
 
     def get_entry(self, name: str) -> LoreEntry | None:
@@ -89,36 +214,71 @@ class Lorebook:
         return list(self.entry_map.values())
 
     def list_enabled_entries(self) -> list[LoreEntry]:
-        """获取全部启用的条目"""
-        return [entry for entry in self.entries if entry.enabled]
+        """获取全部启用的条目（按 priority 排序，缓存列表，只读）"""
+        return self._partitioned()[0]
 
     def list_disabled_entries(self) -> list[LoreEntry]:
-        """获取当前已禁用的条目"""
-        return [e for e in self.entries if not e.enabled]
+        """获取当前已禁用的条目（按 priority 排序，缓存列表，只读）"""
+        return self._partitioned()[1]
 
     def list_entries_sorted(self) -> list[LoreEntry]:
         """获取按 priority 排序的全部 entries"""
-        return sorted(self.entries, key=lambda p: p.priority)
+        return list(self._by_priority)
 
-    # ================= CRUD 接口 =================
+    # ================= 判决接口 =================
 
-    def _resolve(
+    def match_entries(
         self,
-        data: dict,
-        defaults: dict,
-        key: str,
+        text: str,
+        ctx: DecisionCtx,
         *,
-        fallback,
-    ):
+        now: float | None = None,
+    ) -> list[LoreEntry]:
         """
-        通用字段解析：
-        用户指定 > 模板默认 > fallback
+        找出本条消息可进入会话的条目
+
+        - 触发词由索引一次扫描得出全部命中条目
+        - 索引能完整判定且未命中的条目，直接视为文本未命中
+        - 只遍历可文本触发的启用条目；仅 cron 触发的条目先判断窗口
+        - 最终判决仍统一交给 LoreEntry.check_activate
+        - 整轮判决共用同一个 now（time.monotonic() 时基，未指定时取一次当前时刻）
         """
-        if key in data:
-            return data[key]
-        if key in defaults:
-            return defaults[key]
-        return fallback
+        # 只看该发送者 scope 允许的条目；一个都没有时无需扫描
+        text_driven, cron_only = self.eligible_for(ctx)
+        if not text_driven and not cron_only:
+            return []
+
+        # 空文本无需扫描索引，各条目的文本判定会立即返回未命中
+        index = self._keyword_index
+        if text and text_driven and index.available:
+            hits, misses = index.search(text)
+        else:
+            hits, misses = set(), frozenset()
+
+        matched: list[LoreEntry] = []
+        # 循环内反复用到的方法提前绑定到局部变量
+        append = matched.append
+        with time_snapshot(now):
+            for e in text_driven:
+                name = e.name
+                text_hit = True if name in hits else (False if name in misses else None)
+                if e.check_activate(ctx, text=text, text_hit=text_hit):
+                    append(e)
+
+            # 仅 cron 触发的条目：不在窗口内直接跳过，且无需文本匹配
+            cron_matched = [
+                e
+                for e in cron_only
+                if e.in_cron_window and e.check_activate(ctx, text=text, text_hit=False)
+            ]
+
+        if cron_matched:
+            # 两个分区各自有序，合并后恢复整体的 priority 顺序
+            matched.extend(cron_matched)
+            matched.sort(key=_PRI)
+        return matched
+
+    # ================= CRUD 接口 =================
 
     def _resolve_priority(
         self,
@@ -126,11 +286,13 @@ class Lorebook:
         defaults: dict,
         *,
         key: str = "priority",
+        reserved: set[int] | None = None,
     ) -> int:
         """
         priority 规则：
         - 用户显式指定：直接使用
         - 否则：从模板默认 priority（base）开始，取第一个 > base 的可用自增优先级
+        - reserved：同一批次中已分配、尚未注册的 priority，同样视为已占用
         """
         # 1. 用户指定（最高优先级）
         if key in data:
@@ -139,15 +301,19 @@ class Lorebook:
         # 2. 模板起始 priority（base）
         base = defaults.get(key, 0)
 
-        # 3. 收集所有已占用的 priority
-        used = {e.priority for e in self.entries}
+        # 3. 在有序索引中定位第一个 > base 的条目
+        seq = self._by_priority
+        i = bisect.bisect_right(seq, base, key=_PRI)
 
-        # 4. 从 base + 1 开始，找第一个未被占用的
+        # 4. 从 base + 1 开始顺序前进，遇到第一个空位即停
         p = base + 1
-        while p in used:
-            p += 1
-
-        return p
+        while True:
+            while i < len(seq) and seq[i].priority < p:
+                i += 1
+            if (i < len(seq) and seq[i].priority == p) or (reserved and p in reserved):
+                p += 1
+                continue
+            return p
 
     def add_entries(
         self,
@@ -174,6 +340,8 @@ class Lorebook:
             raise ValueError("add_entries 缺少参数")
 
         full_items = []
+        # 本批次已分配的 priority，避免同批条目拿到同一个空位
+        reserved: set[int] = set()
         for item in items:
             if not item.get("name"):
                 raise ValueError("缺少必须的 name 参数")
@@ -183,30 +351,25 @@ class Lorebook:
             template = Template.from_data(item)
             defaults = template.defaults()
 
-            # ===== 字段统一解析 =====
-            enabled = self._resolve(item, defaults, "enabled", fallback=True)
-            scope = self._resolve(item, defaults, "scope", fallback=[])
-            keywords = self._resolve(item, defaults, "keywords", fallback=[])
-            cron = self._resolve(item, defaults, "cron", fallback="")
-            duration = self._resolve(item, defaults, "duration", fallback=0)
-            times = self._resolve(item, defaults, "times", fallback=0)
-            probability = self._resolve(item, defaults, "probability", fallback=1.0)
+            # ===== 字段统一解析：用户指定 > 模板默认 > 兜底值 =====
+            merged = {**_FALLBACKS, **defaults, **item}
             # priority 单独处理
-            priority = self._resolve_priority(item, defaults)
+            priority = self._resolve_priority(item, defaults, reserved=reserved)
+            reserved.add(priority)
 
             # ===== 组装最终 entry 数据 =====
             full_item = {
                 "__template_key": template.value,
                 "template": template.value,
                 "name": item["name"],
-                "enabled": enabled,
+                "enabled": merged["enabled"],
                 "priority": priority,
-                "scope": scope,
-                "keywords": keywords,
-                "cron": cron,
-                "duration": duration,
-                "times": times,
-                "probability": probability,
+                "scope": merged.get("scope", []),
+                "keywords": merged.get("keywords", []),
+                "cron": merged["cron"],
+                "duration": merged["duration"],
+                "times": merged["times"],
+                "probability": merged["probability"],
                 "content": item["content"],
             }
             full_items.append(full_item)
@@ -221,19 +384,22 @@ class Lorebook:
         removed_names: set[str] = set()
 
         for name in names:
-            if self.entry_map.pop(name, None) is not None:
+            entry = self.entry_map.pop(name, None)
+            if entry is not None:
                 success.append(name)
                 removed_names.add(name)
-            else:
+            elif name not in removed_names:
                 failed.append(name)
 
         if removed_names:
+            self._discard_sorted(removed_names)
             self.cfg.entry_storage[:] = [
                 cfg
                 for cfg in self.cfg.entry_storage
                 if cfg.get("name") not in removed_names
             ]
         if success:
+            self._rebuild_index()
             self._save_config()
             self._emit_changed()
 
@@ -247,6 +413,7 @@ class Lorebook:
             return False
         changed = e.add_scope(scope)
         if changed:
+            self._eligible.clear()
             self._save_config()
         return True
 
@@ -256,15 +423,56 @@ class Lorebook:
             return False
         changed = entry.remove_scope(scope)
         if changed:
+            self._eligible.clear()
             self._save_config()
         return True
 
+    def bulk_add_scope(
+        self, names: list[str], scope: str
+    ) -> tuple[list[str], list[str]]:
+        """
+        批量为条目添加 scope，全部处理完后只保存一次
+        返回 (成功的名称, 未找到的名称)
+        """
+        return self._bulk_scope(names, scope, LoreEntry.add_scope)
+
+    def bulk_remove_scope(
+        self, names: list[str], scope: str
+    ) -> tuple[list[str], list[str]]:
+        """
+        批量从条目移除 scope，全部处理完后只保存一次
+        返回 (成功的名称, 未找到的名称)
+        """
+        return self._bulk_scope(names, scope, LoreEntry.remove_scope)
+
+    def _bulk_scope(self, names, scope, op) -> tuple[list[str], list[str]]:
+        ok: list[str] = []
+        fail: list[str] = []
+        changed = False
+        # 循环内反复用到的方法提前绑定到局部变量
+        get = self.entry_map.get
+        ok_append, fail_append = ok.append, fail.append
+        for name in names:
+            entry = get(name)
+            if entry is None:
+                fail_append(name)
+                continue
+            changed |= op(entry, scope)
+            ok_append(name)
+        if changed:
+            self._eligible.clear()
+            self._save_config()
+        return ok, fail
+
     def update_keywords(self, name: str, keywords: list[str]) -> bool:
         entry = self.entry_map.get(name)
         if not entry:
             return False
 
         entry.set_keywords(keywords)
+        # 触发词清空 / 新增会改变条目的触发方式分区
+        self._partition = None
+        self._rebuild_index()
         self._save_config()
         return True
 
@@ -273,25 +481,29 @@ class Lorebook:
         if not entry:
             return False
 
+        self._remove_sorted(entry)
         entry.set_priority(priority)
+        self._insert_sorted(entry)
         self._save_config()
         return True
 
     # ================= 读取文件 =================
 
-    def load_entry_from_lorefile(self, file_path: Path) -> None:
+    async def load_entry_from_lorefile(self, file_path: Path) -> list[str]:
         """
         从世界书文件中加载条目到配置中
         规则:
           - 仅支持 Json 和 Yaml 文件
           - 同名条目会跳过
+          - 读取与解析在线程中进行，不阻塞事件循环；条目注册仍在事件循环内完成
         """
         try:
-            raw_entries = LoreFile.load(file_path)
-            self.add_entries(raw_entries)
+            raw_entries = await asyncio.to_thread(LoreFile.load, file_path)
+            with self._batch_saves():
+                return self.add_entries(raw_entries)
         except Exception as e:
             logger.error(f"[lorebook] 加载失败: {file_path} ({e})")
-            return
+            return []
 
     def export_lorefile(self, path: str) -> None:
         """
@@ -6,6 +6,18 @@ from typing import Any
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as _SafeDumper
+    from yaml import CSafeLoader as _SafeLoader
+except ImportError:  # PyYAML 未编译 libyaml 时回退到纯 Python 实现
+    from yaml import SafeDumper as _SafeDumper
+    from yaml import SafeLoader as _SafeLoader
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时回退到标准库 json
+    orjson = None
+
 from astrbot.api import logger
 
 from .entry import LoreEntry
@@ -22,18 +34,16 @@ class LoreFile:
     def _load_raw(path: Path) -> Any:
         suffix = path.suffix.lower()
         try:
-            with path.open("r", encoding="utf-8") as f:
-                if suffix in {".yaml", ".yml"}:
-                    import yaml
-
-                    return yaml.safe_load(f)
-
-                if suffix == ".json":
-                    import json
-
-                    return json.load(f)
-
+            if suffix not in {".json", ".yaml", ".yml"}:
                 raise ValueError(f"不支持的文件类型: {suffix}")
+
+            # 按字节读取，直接交给解析器（orjson / libyaml 均可自行解码 utf-8）
+            raw = path.read_bytes()
+            if suffix == ".json":
+                return orjson.loads(raw) if orjson else json.loads(raw)
+            return yaml.load(raw, Loader=_SafeLoader)
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise RuntimeError(f"读取 lorefile 失败: {e}") from e
 
@@ -44,9 +54,7 @@ class LoreFile:
         """
         从 lorefile 中读取原始 entry dict 列表
         """
-        if not path.exists():
-            raise FileNotFoundError(path)
-
+        # 文件不存在时由读取本身抛出 FileNotFoundError，无需预先 stat
         data = LoreFile._load_raw(path)
 
         # 兼容：
@@ -91,16 +99,22 @@ class LoreFile:
         suffix = path.suffix.lower()
         try:
             if suffix in {".yaml", ".yml"}:
-                with path.open("w", encoding="utf-8") as f:
-                    yaml.safe_dump(
+                # 指定 encoding 后由 emitter 直接输出 utf-8 字节，跳过文本层编码
+                with path.open("wb") as f:
+                    yaml.dump(
                         payload,
                         f,
+                        Dumper=_SafeDumper,
                         allow_unicode=True,
                         sort_keys=False,
+                        encoding="utf-8",
                     )
                 return
 
             if suffix == ".json":
+                if orjson:
+                    path.write_bytes(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+                    return
                 with path.open("w", encoding="utf-8") as f:
                     json.dump(
                         payload,
@@ -0,0 +1,354 @@
+# core/matcher.py
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Iterable
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from astrbot.api import logger
+
+try:  # 正则解析器（仅用于求最短匹配长度），3.11 起更名为 re._parser
+    from re import _parser as _sre_parse
+except ImportError:
+    import sre_parse as _sre_parse
+
+try:
+    import hyperscan
+except ImportError:  # 可选依赖，缺失时回退到标准库 re
+    hyperscan = None
+
+try:
+    import ahocorasick
+except ImportError:  # 可选依赖，缺失时各条目自行做子串判断
+    ahocorasick = None
+
+if TYPE_CHECKING:
+    from .entry import LoreEntry
+
+# 正则元字符，不含这些字符的关键词可按普通子串匹配
+_META_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+# 未设置任何内联标志时的默认 flags，用于识别 (?i) 这类全局内联标志
+_DEFAULT_FLAGS = re.compile("").flags
+
+# 反向引用 / 条件组引用，合并为并集后组号会错位
+_BACKREF_RE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+# hyperscan 与 re 语义一致的计数量词：{n} / {n,} / {n,m}
+_HS_BRACE_RE = re.compile(r"\{\d+(?:,\d*)?\}")
+
+
+@lru_cache(maxsize=4096)
+def compile_cached(pattern: str) -> re.Pattern:
+    """
+    进程级正则编译缓存
+
+    pattern 为纯字符串，可直接作为缓存键；
+    多个条目共用的关键词（如条目名）只会编译一次
+    """
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=4096)
+def min_match_len(pattern: re.Pattern) -> int:
+    """
+    正则可能匹配的最短长度（字符数）
+
+    文本比它短时必然不命中，可直接跳过匹配；解析失败时保守返回 0
+    """
+    try:
+        return _sre_parse.parse(pattern.pattern, pattern.flags).getwidth()[0]
+    except Exception:
+        return 0
+
+
+def is_literal(keyword: str) -> bool:
+    """关键词是否为纯字面量（不含任何正则元字符）"""
+    return _META_CHARS.isdisjoint(keyword)
+
+
+def can_union(pattern: re.Pattern) -> bool:
+    """该正则能否安全地并入 (?:p1)|(?:p2) 形式的并集正则"""
+    if pattern.flags != _DEFAULT_FLAGS:
+        return False
+    if pattern.groupindex:
+        return False
+    return _BACKREF_RE.search(pattern.pattern) is None
+
+
+def hyperscan_safe(pattern: str) -> bool:
+    """
+    该正则能否交由 hyperscan 判定（保守的语法白名单）
+
+    hyperscan 按 PCRE 语法解读模式，部分写法与 re 语义不同，
+    如 {,n}、\\Z、\\v、\\s、[[:alpha:]]，编译成功也不代表结果一致；
+    因此只放行字面量、.、字符组、分组 (?:...)、|、^ 与 *+?{n,m} 量词，
+    转义仅限标点符号，其余模式一律交给 re
+    """
+    try:
+        pattern.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+
+    i, n = 0, len(pattern)
+    in_class = False
+    class_start = 0
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            # \d \s \w \b \Z \v \1 等字母数字转义一律不放行
+            if i + 1 >= n or pattern[i + 1].isalnum():
+                return False
+            i += 2
+            continue
+        if in_class:
+            if c == "[":
+                return False
+            if c == "]" and i > class_start:
+                in_class = False
+        elif c == "[":
+            if pattern.startswith(("[:", "[.", "[="), i):
+                return False
+            in_class = True
+            class_start = i + 1
+            if pattern.startswith("^", class_start):
+                class_start += 1
+        elif c == "{":
+            m = _HS_BRACE_RE.match(pattern, i)
+            if m is None:
+                return False
+            i = m.end()
+            continue
+        elif c == "(":
+            if pattern.startswith("(?", i) and not pattern.startswith("(?:", i):
+                return False
+        elif c in "$}":
+            return False
+        i += 1
+    return not in_class
+
+
+class HyperscanMatcher:
+    """
+    基于 hyperscan 的多模式匹配（可选加速）
+
+    - 所有模式编译进同一个数据库，一次线性扫描即可得出全部命中的模式 id
+    - hyperscan 不可用或模式不被支持时，build 返回 None，由调用方回退到 re
+    """
+
+    __slots__ = ("_db",)
+
+    def __init__(self, db):
+        self._db = db
+
+    @classmethod
+    def build(cls, patterns: list[str]) -> HyperscanMatcher | None:
+        """编译模式列表，模式 id 即其下标"""
+        if hyperscan is None or not patterns:
+            return None
+
+        flags = (
+            hyperscan.HS_FLAG_UTF8
+            | hyperscan.HS_FLAG_UCP
+            | hyperscan.HS_FLAG_SINGLEMATCH
+            | hyperscan.HS_FLAG_ALLOWEMPTY
+        )
+        db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        try:
+            db.compile(
+                expressions=[p.encode("utf-8") for p in patterns],
+                ids=list(range(len(patterns))),
+                elements=len(patterns),
+                flags=[flags] * len(patterns),
+            )
+        except hyperscan.error as e:
+            logger.debug(f"[matcher] hyperscan 编译失败: {e}")
+            return None
+        return cls(db)
+
+    @staticmethod
+    def supports(pattern: str) -> bool:
+        """单个模式能否被 hyperscan 编译"""
+        return HyperscanMatcher.build([pattern]) is not None
+
+    def scan(self, text: str) -> set[int] | None:
+        """
+        返回命中的模式 id（SINGLEMATCH 保证每个 id 只回调一次）
+
+        文本含孤立代理字符等无法编码为 UTF-8 时返回 None，由调用方回退到 re
+        """
+        try:
+            data = text.encode("utf-8")
+        except UnicodeEncodeError:
+            return None
+
+        hits: set[int] = set()
+
+        def on_match(pattern_id: int, *_) -> None:
+            hits.add(pattern_id)
+
+        self._db.scan(data, match_event_handler=on_match)
+        return hits
+
+
+class KeywordIndex:
+    """
+    跨条目的触发词索引
+
+    - 字面量关键词汇总为 Aho-Corasick 自动机（pyahocorasick 可用时）
+    - 可合并且语法在白名单内的正则关键词汇总为一个 hyperscan 数据库（hyperscan 可用时）
+    - 未能纳入 hyperscan 的可合并正则，汇总为一个跨条目的并集正则作为预筛：
+      并集未命中时，这些条目可直接判定为文本未命中
+    - 一次扫描找出所有命中的条目名，以及可由索引判定未命中的条目范围，
+      其余条目仍由 LoreEntry 自行匹配
+    """
+
+    # 字面量少于该数量时不建自动机：逐条目子串判断（C 实现）反而更快
+    _MIN_AUTOMATON_WORDS = 8
+    # 扫描结果缓存：条目数上限（超出时整体清空），及参与缓存的最长文本
+    _SEARCH_CACHE_SIZE = 256
+    _SEARCH_CACHE_MAX_TEXT = 512
+
+    def __init__(self):
+        self._automaton = None
+        self._hyperscan: HyperscanMatcher | None = None
+        # hyperscan 模式 id -> 条目名
+        self._pattern_owners: list[tuple[str, ...]] = []
+        # 跨条目并集正则（预筛，只判断"是否全部未命中"）
+        self._prefilter: Callable[[str], re.Match | None] | None = None
+        # 文本命中与否可由索引完整判定的条目名
+        self._covered: frozenset[str] = frozenset()
+        # 预筛未命中时，额外可判定为未命中的条目名（含 _covered）
+        self._covered_on_miss: frozenset[str] = frozenset()
+        # 文本 -> search 结果；群聊中重复出现的消息无需再次扫描，重建索引时清空
+        self._search_cache: dict[str, tuple[frozenset[str], frozenset[str]]] = {}
+
+    @property
+    def available(self) -> bool:
+        return (
+            self._automaton is not None
+            or self._hyperscan is not None
+            or self._prefilter is not None
+        )
+
+    def rebuild(self, entries: Iterable[LoreEntry]) -> None:
+        """按当前条目重建索引"""
+        entries = list(entries)
+        self._search_cache.clear()
+        self._automaton = None
+        self._hyperscan = None
+        self._pattern_owners = []
+        self._prefilter = None
+
+        self._build_literals(entries)
+        accepted = self._build_patterns(entries)
+
+        covered: set[str] = set()
+        on_miss: set[str] = set()
+        rest: dict[str, None] = {}
+        for e in entries:
+            if e.has_extra_patterns:
+                continue
+            if e.literals and self._automaton is None:
+                continue
+            pending = [p for p in e.union_patterns if p not in accepted]
+            if not pending:
+                covered.add(e.name)
+                continue
+            on_miss.add(e.name)
+            rest.update(dict.fromkeys(pending))
+
+        if rest:
+            try:
+                fused = compile_cached("|".join(f"(?:{p})" for p in rest))
+                self._prefilter = fused.search
+            except re.error as e:
+                logger.debug(f"[matcher] 并集预筛编译失败，相关条目回退到逐条匹配: {e}")
+                on_miss.clear()
+
+        if not self.available:
+            covered.clear()
+            on_miss.clear()
+        self._covered = frozenset(covered)
+        self._covered_on_miss = self._covered | on_miss
+
+    def _build_literals(self, entries: list[LoreEntry]) -> None:
+        if ahocorasick is None:
+            return
+
+        owners: dict[str, list[str]] = {}
+        for e in entries:
+            for literal in e.literals:
+                owners.setdefault(literal, []).append(e.name)
+        if len(owners) < self._MIN_AUTOMATON_WORDS:
+            return
+
+        automaton = ahocorasick.Automaton()
+        for literal, names in owners.items():
+            automaton.add_word(literal, tuple(names))
+        automaton.make_automaton()
+        self._automaton = automaton
+
+    def _build_patterns(self, entries: list[LoreEntry]) -> set[str]:
+        """编译跨条目 hyperscan 数据库，返回成功纳入的模式"""
+        if hyperscan is None:
+            return set()
+
+        owners: dict[str, list[str]] = {}
+        for e in entries:
+            for pattern in e.union_patterns:
+                if hyperscan_safe(pattern):
+                    owners.setdefault(pattern, []).append(e.name)
+        if not owners:
+            return set()
+
+        patterns = list(owners)
+        matcher = HyperscanMatcher.build(patterns)
+        if matcher is None:
+            # 整体编译失败时剔除不被支持的模式，其所属条目回退到 re
+            patterns = [p for p in patterns if HyperscanMatcher.supports(p)]
+            matcher = HyperscanMatcher.build(patterns)
+            if matcher is None:
+                return set()
+
+        self._hyperscan = matcher
+        self._pattern_owners = [tuple(owners[p]) for p in patterns]
+        return set(patterns)
+
+    def search(self, text: str) -> tuple[frozenset[str], frozenset[str]]:
+        """
+        返回 (关键词命中的条目名, 可判定为未命中的条目名)
+
+        不在两者中的条目，需由 LoreEntry 自行匹配；
+        结果只取决于文本与当前索引，较短的文本按文本缓存
+        """
+        if not text:
+            return frozenset(), self._covered_on_miss
+
+        cache = self._search_cache
+        result = cache.get(text)
+        if result is None:
+            result = self._scan(text)
+            if len(text) <= self._SEARCH_CACHE_MAX_TEXT:
+                if len(cache) >= self._SEARCH_CACHE_SIZE:
+                    cache.clear()
+                cache[text] = result
+        return result
+
+    def _scan(self, text: str) -> tuple[frozenset[str], frozenset[str]]:
+        hits: set[str] = set()
+        if self._automaton is not None:
+            for _, names in self._automaton.iter(text):
+                hits.update(names)
+        if self._hyperscan is not None:
+            pattern_ids = self._hyperscan.scan(text)
+            if pattern_ids is None:
+                # 无法交给 hyperscan 判定：只保留字面量命中，其余条目自行匹配
+                return frozenset(hits), frozenset()
+            owners = self._pattern_owners
+            for pattern_id in pattern_ids:
+                hits.update(owners[pattern_id])
+        if self._prefilter is not None and self._prefilter(text) is None:
+            return frozenset(hits), self._covered_on_miss
+        return frozenset(hits), self._covered
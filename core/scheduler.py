@@ -1,8 +1,11 @@
 # core/scheduler.py
 from __future__ import annotations
 
+import asyncio
+import weakref
 from typing import TYPE_CHECKING
 
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
@@ -64,6 +67,9 @@ class LoreCronScheduler:
     LoreEntry 定时激活调度器（cron → 触发条目）
     """
 
+    # reload 合并窗口（秒）：窗口内的多次变更只触发一次重新注册
+    _RELOAD_DELAY = 0.05
+
     def __init__(self, lorebook: Lorebook, sessions: SessionCache):
         # 只依赖两个“纯业务对象”，不依赖 plugin / event
         self._lorebook = lorebook
@@ -73,6 +79,13 @@ class LoreCronScheduler:
         self._scheduler = AsyncIOScheduler()
         self._started = False
 
+        # cron 串 -> 解析后的触发器，无效 cron 记为 None，避免 reload 时重复解析
+        self._triggers: dict[str, CronTrigger | None] = {}
+        # 已注册的任务：entry.name -> (cron 串, 条目弱引用)，reload 时据此只处理差异
+        self._registered: dict[str, tuple[str, weakref.ref[LoreEntry]]] = {}
+        # 已排队、尚未执行的 reload
+        self._reload_handle: asyncio.TimerHandle | None = None
+
         # 订阅 Lorebook 的变更事件
         self._lorebook.on_changed.append(self.reload)
 
@@ -101,22 +114,40 @@ class LoreCronScheduler:
         if not self._started:
             return
 
+        if self._reload_handle is not None:
+            self._reload_handle.cancel()
+            self._reload_handle = None
         self._scheduler.shutdown(wait=False)
+        self._registered.clear()
         self._started = False
         logger.debug("[cron] scheduler stopped")
 
     def reload(self) -> None:
         """
-        重新加载所有 cron 任务
+        重新加载所有 cron 任务（只增删 / 替换发生变化的任务）
 
         使用场景：
         - 新增 / 删除条目
         - 修改条目的 cron 字段
+
+        在事件循环中调用时延迟 _RELOAD_DELAY 秒执行，连续的变更合并为一次
         """
+        if not self._started or self._reload_handle is not None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 无运行中的事件循环：立即执行
+            self._do_reload()
+            return
+        self._reload_handle = loop.call_later(self._RELOAD_DELAY, self._do_reload)
+
+    def _do_reload(self) -> None:
+        self._reload_handle = None
         if not self._started:
             return
 
-        self._scheduler.remove_all_jobs()
         self._register_all()
         logger.debug("[cron] scheduler reloaded")
 
@@ -124,41 +155,90 @@ class LoreCronScheduler:
 
     def _register_all(self) -> None:
         """
-        遍历所有 entry，尝试注册其 cron
+        遍历所有 entry，使已注册任务与条目的 cron 保持一致
+
+        - 不再需要的任务移除
+        - 新增或 cron 变化的任务注册 / 替换
+        - 未变化的任务不做任何操作
         """
+        live: set[str] = set()
+        desired: dict[str, LoreEntry] = {}
         for entry in self._lorebook.list_entries():
             if entry.enabled_cron:
+                live.add(entry.cron)
+                desired[entry.name] = entry
+
+        for name in self._registered.keys() - desired.keys():
+            try:
+                self._scheduler.remove_job(self._job_id(name))
+            except JobLookupError:
+                pass
+            del self._registered[name]
+
+        for name, entry in desired.items():
+            registered = self._registered.get(name)
+            # cron 变化，或同名条目已被替换为新对象（弱引用指向旧对象）时重新注册
+            if (
+                registered is None
+                or registered[0] != entry.cron
+                or registered[1]() is not entry
+            ):
                 self._try_register_entry(entry)
 
+        # 清理已无条目使用的 cron，缓存大小随条目而非历史增长
+        for cron in self._triggers.keys() - live:
+            del self._triggers[cron]
+
+    def _get_trigger(self, entry: LoreEntry) -> CronTrigger | None:
+        """按 cron 串取触发器，首次解析后缓存（触发器无状态，可跨任务共用）"""
+        cron = entry.cron
+        if cron in self._triggers:
+            return self._triggers[cron]
+
+        try:
+            # 使用标准 5 段 cron：分 时 日 月 周
+            trigger = _build_trigger(cron)
+        except Exception as e:
+            logger.warning(f"[cron] 条目 {entry.name} cron 无效，已忽略: {cron} ({e})")
+            trigger = None
+        self._triggers[cron] = trigger
+        return trigger
+
     def _try_register_entry(self, entry: LoreEntry) -> None:
         """
         尝试为单个 entry 注册 cron 任务
         """
-        try:
-            # 使用标准 5 段 cron：分 时 日 月 周
-            trigger = _build_trigger(entry.cron)
-        except Exception as e:
-            logger.warning(
-                f"[cron] 条目 {entry.name} cron 无效，已忽略: {entry.cron} ({e})"
-            )
+        trigger = self._get_trigger(entry)
+        if trigger is None:
+            # cron 改为无效值时，撤掉该条目旧的任务
+            if self._registered.pop(entry.name, None) is not None:
+                try:
+                    self._scheduler.remove_job(self._job_id(entry.name))
+                except JobLookupError:
+                    pass
             return
 
-        # job_id 使用 entry.name，确保 reload / 覆盖是幂等的
-        job_id = f"loreentry:{entry.name}"
-
+        ref = weakref.ref(entry)
         self._scheduler.add_job(
             self._on_trigger,
             trigger=trigger,
-            args=[entry.name],
-            id=job_id,
+            # 直接持有条目（弱引用），触发时无需再按名字查找 Lorebook
+            args=[ref],
+            id=self._job_id(entry.name),
             replace_existing=True,
         )
+        self._registered[entry.name] = (entry.cron, ref)
 
         logger.debug(f"[cron] 已注册定时条目: {entry.name} ({entry.cron})")
 
-    def _on_trigger(self, entry_name: str) -> None:
-        entry = self._lorebook.get_entry(entry_name)
-        if not entry or not entry.enabled:
+    @staticmethod
+    def _job_id(name: str) -> str:
+        # job_id 使用 entry.name，确保 reload / 覆盖是幂等的
+        return f"loreentry:{name}"
+
+    def _on_trigger(self, ref: weakref.ref[LoreEntry]) -> None:
+        entry = ref()
+        if entry is None or not entry.enabled:
             return
 
         # 只通知 entry：cron 已触发
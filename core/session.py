@@ -1,12 +1,17 @@
 # core/session.py
 from __future__ import annotations
 
-import copy
+import logging
+from collections import OrderedDict
+from itertools import islice
+from operator import attrgetter
 
 from astrbot.api import logger
 
 from .config import PluginConfig
-from .entry import LoreEntry
+from .entry import DecisionCtx, LoreEntry
+
+_PRI = attrgetter("priority")
 
 
 class SessionCache:
@@ -14,31 +19,81 @@ class SessionCache:
 
     def __init__(self, config: PluginConfig):
         self.cfg = config
-        # umo -> active LoreEntry list
-        self._data: dict[str, list[LoreEntry]] = {}
+        # umo -> {name: LoreEntry}，按挂载顺序排列（最旧在前）
+        self._data: dict[str, OrderedDict[str, LoreEntry]] = {}
+        # umo -> 按优先级升序的条目列表，会话内容变化时失效
+        self._sorted: dict[str, list[LoreEntry]] = {}
+
+    def _prune(self, umo: str) -> OrderedDict[str, LoreEntry] | None:
+        """
+        原地移除会话中不活跃的条目（保持挂载顺序）
+        会话为空时一并移除，返回 None
+        """
+        entries = self._data.get(umo)
+        if not entries:
+            return None
+
+        # 快速路径：全部仍活跃（连续对话中的常见情况）时不做任何分配
+        for i, (name, e) in enumerate(entries.items()):
+            if not e.active:
+                break
+        else:
+            return entries
+
+        # 从第一个不活跃的条目开始收集，之前的已确认活跃，不再重复判定
+        stale = [name]
+        stale.extend(
+            n for n, e in islice(entries.items(), i + 1, None) if not e.active
+        )
+        self._sorted.pop(umo, None)
+        if len(stale) == len(entries):
+            self._data.pop(umo, None)
+            return None
+        for name in stale:
+            del entries[name]
+        return entries
 
     def get_sorted_active(self, umo: str) -> list[LoreEntry]:
         """
         获取当前会话的有效条目（按优先级升序）
         不活跃的会被直接移除
+
+        排序结果按会话缓存，仅在会话内容变化后重新排序；
+        返回的列表为只读视图，调用方不要原地修改
         """
-        entries = self._data.get(umo)
+        entries = self._prune(umo)
         if not entries:
             return []
 
-        # 只保留活跃的
-        active_entries = [e for e in entries if e.active]
+        cached = self._sorted.get(umo)
+        if cached is None:
+            # priority 数字越小，顺序越靠前
+            cached = self._sorted[umo] = sorted(entries.values(), key=_PRI)
+        return cached
 
-        if not active_entries:
-            self._data.pop(umo, None)
-            return []
-
-        # priority 数字越小，顺序越靠前
-        active_entries.sort(key=lambda x: x.priority)
+    def select(self, umo: str, ctx: DecisionCtx, limit: int) -> list[LoreEntry]:
+        """
+        选出本次请求要注入的条目（按优先级升序）
 
-        # 回写：确保 data 里只有活跃的
-        self._data[umo] = active_entries
-        return active_entries
+        - 先做使用阶段 scope 判定，再按 limit 截断（limit <= 0 表示不限）
+        - 凑满 limit 即停止，之后的条目无需逐个判定
+        """
+        selected: list[LoreEntry] = []
+        entries = self.get_sorted_active(umo)
+        for i, e in enumerate(entries):
+            if not e.allow_consume(ctx):
+                logger.debug(f"[条目:{e.name}] 使用阶段 scope 不满足，已跳过")
+                continue
+            selected.append(e)
+            if len(selected) == limit:
+                if logger.isEnabledFor(logging.DEBUG):
+                    dropped = [x.name for x in entries[i + 1 :] if x.allow_consume(ctx)]
+                    if dropped:
+                        logger.debug(
+                            f"超出最大允许注入数 {limit}，已忽略 [{', '.join(dropped)}]"
+                        )
+                break
+        return selected
 
     def attach(self, umo: str, entries: list[LoreEntry]) -> None:
         """
@@ -49,46 +104,47 @@ class SessionCache:
         - allow_same_priority=True ：允许同 priority 并存
         """
 
-        # 1. 取出旧条目
-        old_entries = self.get_sorted_active(umo)
-
-        # 2. 深拷贝新条目
-        new_entries: list[LoreEntry] = [copy.deepcopy(e) for e in entries]
-
-        # 3. 按 name 合并（新覆盖旧）
-        old_by_name: dict[str, LoreEntry] = {e.name: e for e in old_entries}
-        new_by_name: dict[str, LoreEntry] = {e.name: e for e in new_entries}
+        # 1. 取出旧条目（原地剔除不活跃的；合并无需按优先级排序）
+        self._sorted.pop(umo, None)
+        merged = self._prune(umo)
+        if merged is None:
+            merged = self._data[umo] = OrderedDict()
 
-        merged_by_name: dict[str, LoreEntry] = dict(old_by_name)
-        merged_by_name.update(new_by_name)  # 新 > 旧
-
-        merged: list[LoreEntry] = list(merged_by_name.values())
+        # 2. 按 name 合并（新覆盖旧），复制新条目与 Lorebook 中的原条目隔离，
+        #    并移到最新的一端
+        for e in entries:
+            merged[e.name] = e.clone()
+            merged.move_to_end(e.name)
 
-        # 4. 按 priority 合并（可选）
+        # 3. 按 priority 合并（可选）
         if not self.cfg.allow_same_priority:
-            by_priority: dict[int, LoreEntry] = {}
+            by_priority: dict[int, str] = {}
+            losers: list[str] = []
 
             # 关键点：
-            # merged 中已经保证「同名新 > 旧」
+            # merged 中已经保证「同名新 > 旧」且越新越靠后
             # 这里再次利用 dict 覆盖，保证「同 priority 新 > 旧」
-            for e in merged:
-                if e.priority in by_priority:
+            for name, e in merged.items():
+                prev = by_priority.get(e.priority)
+                if prev is not None:
                     logger.debug(
-                        f"优先级[{e.priority}]冲突，已覆盖条目: "
-                        f"{by_priority[e.priority].name} -> {e.name}"
+                        f"优先级[{e.priority}]冲突，已覆盖条目: {prev} -> {name}"
                     )
-                by_priority[e.priority] = e
+                    losers.append(prev)
+                by_priority[e.priority] = name
 
-            merged = list(by_priority.values())
+            for name in losers:
+                del merged[name]
 
-        # 挂载条目到会话下
-        self._data[umo] = merged
+        if not merged:
+            self._data.pop(umo, None)
+            return
 
-        # 激活最终条目
-        for e in merged:
+        # 4. 激活最终条目
+        for e in merged.values():
             e.enter_session()
 
-        logger.debug(f"已挂载并激活条目: {[e.name for e in merged]}")
+        logger.debug(f"已挂载并激活条目: {list(merged)}")
 
     def remove(self, umo: str, names: list[str]) -> list[str]:
         """
@@ -99,18 +155,11 @@ class SessionCache:
         if not entries:
             return []
 
-        names_set = set(names)
-        remain: list[LoreEntry] = []
-        removed: list[str] = []
-
-        for e in entries:
-            if e.name in names_set:
-                removed.append(e.name)
-            else:
-                remain.append(e)
+        removed = [name for name in names if entries.pop(name, None) is not None]
+        if removed:
+            self._sorted.pop(umo, None)
 
-        if remain:
-            self._data[umo] = remain
+        if entries:
             logger.debug(f"Removed {removed} from {umo}")
         else:
             self._data.pop(umo, None)
@@ -123,4 +172,5 @@ class SessionCache:
         强制清除会话的所有prompts
         """
         self._data.pop(umo, None)
+        self._sorted.pop(umo, None)
         logger.debug(f"[SessionManager] clear session {umo}")
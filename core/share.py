@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-import shutil
-import uuid
+import tempfile
+from pathlib import Path
 
 import aiohttp
 
@@ -25,17 +25,32 @@ class LorebookShare:
     def __init__(self, lorebook: Lorebook, config: PluginConfig):
         self.lorebook = lorebook
         self.cfg = config
-
-    async def download_file(self, url: str) -> bytes | None:
-        """下载文件"""
-        url = url.replace("https://", "http://")
+        # 复用的 HTTP 会话（连接池 / DNS 缓存），首次下载时在事件循环内创建
+        self._client: aiohttp.ClientSession | None = None
+
+    def _get_client(self) -> aiohttp.ClientSession:
+        if self._client is None or self._client.closed:
+            self._client = aiohttp.ClientSession()
+        return self._client
+
+    async def close(self) -> None:
+        """关闭复用的 HTTP 会话（插件卸载时调用）"""
+        if self._client is not None and not self._client.closed:
+            await self._client.close()
+        self._client = None
+
+    async def download_file(self, url: str, path: Path) -> bool:
+        """下载文件：分块直接写入 path，内存占用与文件大小无关"""
         try:
-            async with aiohttp.ClientSession() as client:
-                response = await client.get(url)
-                img_bytes = await response.read()
-                return img_bytes
+            async with self._get_client().get(url) as response:
+                response.raise_for_status()
+                with path.open("wb") as f:
+                    async for chunk in response.content.iter_chunked(65536):
+                        f.write(chunk)
+            return path.stat().st_size > 0
         except Exception as e:
-            logger.error(f"图片下载失败: {e}")
+            logger.error(f"文件下载失败: {e}")
+            return False
 
     # ================= 导出 =================
 
@@ -55,10 +70,12 @@ class LorebookShare:
         name = name or f"{event.get_sender_name()}_lorebook"
         filename = f"{name}.{export_format}"
 
-        workdir = self.cfg.export_dir / uuid.uuid4().hex
-        workdir.mkdir(parents=True, exist_ok=True)
-
-        lorefile = workdir / filename
+        # 单文件无需独立目录：临时文件只需后缀正确（决定导出格式）
+        # 上传时另行指定文件名
+        with tempfile.NamedTemporaryFile(
+            suffix=f".{export_format}", dir=self.cfg.export_dir, delete=False
+        ) as tmp:
+            lorefile = Path(tmp.name)
 
         try:
             # 导出为单文件
@@ -85,7 +102,7 @@ class LorebookShare:
             yield event.plain_result("世界书导出失败")
 
         finally:
-            shutil.rmtree(workdir, ignore_errors=True)
+            lorefile.unlink(missing_ok=True)
             event.stop_event()
 
     # ================= 导入 =================
@@ -116,21 +133,21 @@ class LorebookShare:
             yield event.plain_result("仅支持 .json / .yaml / .yml 世界书文件")
             return
 
-        data = await self.download_file(file_comp.url)
-        if not data:
-            yield event.plain_result("文件下载失败")
-            return
-
-        workdir = self.cfg.import_dir / uuid.uuid4().hex
-        workdir.mkdir(parents=True, exist_ok=True)
-        name = file_comp.name or file_comp.url.split("/")[-1]
-        lorefile = workdir / name
+        # 导入只依赖后缀（决定解析格式），文件名本身无关
+        with tempfile.NamedTemporaryFile(
+            suffix=Path(file_comp.name).suffix.lower(),
+            dir=self.cfg.import_dir,
+            delete=False,
+        ) as tmp:
+            lorefile = Path(tmp.name)
 
         try:
-            lorefile.write_bytes(data)
+            if not await self.download_file(file_comp.url, lorefile):
+                yield event.plain_result("文件下载失败")
+                return
 
             # 直接按世界书文件导入
-            self.lorebook.load_entry_from_lorefile(lorefile)
+            await self.lorebook.load_entry_from_lorefile(lorefile)
 
             yield event.plain_result("该世界书导入完成")
             event.stop_event()
@@ -140,4 +157,4 @@ class LorebookShare:
             yield event.plain_result(f"导入失败: {e}")
 
         finally:
-            shutil.rmtree(workdir, ignore_errors=True)
+            lorefile.unlink(missing_ok=True)
@@ -14,8 +14,8 @@ class Template(str, Enum):
     GROUP = "group"
 
     @classmethod
-    def values(cls) -> set[str]:
-        return {e.value for e in cls}
+    def values(cls) -> frozenset[str]:
+        return _VALUES
 
     @classmethod
     def from_data(cls, data: dict) -> "Template":  # noqa: UP037
@@ -28,12 +28,13 @@ class Template(str, Enum):
         """
         raw = data.get("template") or data.get("__template_key") or cls.DEFAULT.value
 
-        try:
-            return cls(raw)
-        except ValueError:
+        # 直接查表，省去 Enum 构造调用及失败时的异常开销
+        template = _BY_VALUE.get(raw) if isinstance(raw, str) else None
+        if template is None:
             raise ValueError(
-                f"未知的模板类型 template={raw}，可选值: {', '.join(cls.values())}"
+                f"未知的模板类型 template={raw}，可选值: {', '.join(_BY_VALUE)}"
             )
+        return template
 
     def defaults(self) -> dict[str, Any]:
         """
@@ -42,51 +43,64 @@ class Template(str, Enum):
         规则：
         - default 模板定义基准值
         - 其他模板只覆盖差异字段
+        - 合并结果按模板缓存；返回副本（list 值同样复制），调用方可随意修改
         """
-        base = {
-            "priority": 50,
-            "keywords": [],
-            "cron": "",
-            "duration": 180,
-            "times": 5,
-            "probability": 1,
-        }
+        merged = _DEFAULTS_CACHE.get(self)
+        if merged is None:
+            merged = _DEFAULTS_CACHE[self] = {
+                **_BASE_DEFAULTS,
+                **_OVERRIDES.get(self, {}),
+            }
+        return {k: list(v) if isinstance(v, list) else v for k, v in merged.items()}
 
-        overrides: dict[Template, dict[str, Any]] = {
-            Template.DEFAULT: {},
-            Template.COMMON: {},
-            Template.RESIDENT: {
-                "priority": 10,
-                "keywords": [".*"],
-                "duration": 0,
-                "times": 0,
-            },
-            Template.CHANCE: {
-                "priority": 30,
-                "keywords": [".*"],
-                "times": 1,
-                "probability": 0.05,
-            },
-            Template.SCHEDULE: {
-                "priority": 80,
-                "cron": "0 0 * * *",
-                "duration": 86400,
-                "times": 1,
-            },
-            Template.GROUP: {
-                "priority": 120,
-                "keywords": [".*"],
-                "duration": 0,
-                "times": 0,
-            },
-            Template.USER: {
-                "priority": 150,
-                "keywords": [".*"],
-                "duration": 0,
-                "times": 0,
-            },
-        }
 
-        result = dict(base)
-        result.update(overrides.get(self, {}))
-        return result
+# 模板值 -> 模板（按定义顺序），及全部合法值
+_BY_VALUE: dict[str, Template] = {e.value: e for e in Template}
+_VALUES: frozenset[str] = frozenset(_BY_VALUE)
+
+_BASE_DEFAULTS: dict[str, Any] = {
+    "priority": 50,
+    "keywords": [],
+    "cron": "",
+    "duration": 180,
+    "times": 5,
+    "probability": 1,
+}
+
+_OVERRIDES: dict[Template, dict[str, Any]] = {
+    Template.DEFAULT: {},
+    Template.COMMON: {},
+    Template.RESIDENT: {
+        "priority": 10,
+        "keywords": [".*"],
+        "duration": 0,
+        "times": 0,
+    },
+    Template.CHANCE: {
+        "priority": 30,
+        "keywords": [".*"],
+        "times": 1,
+        "probability": 0.05,
+    },
+    Template.SCHEDULE: {
+        "priority": 80,
+        "cron": "0 0 * * *",
+        "duration": 86400,
+        "times": 1,
+    },
+    Template.GROUP: {
+        "priority": 120,
+        "keywords": [".*"],
+        "duration": 0,
+        "times": 0,
+    },
+    Template.USER: {
+        "priority": 150,
+        "keywords": [".*"],
+        "duration": 0,
+        "times": 0,
+    },
+}
+
+# 模板 -> 合并后的默认值（只读，经 defaults() 复制后再交给调用方）
+_DEFAULTS_CACHE: dict[Template, dict[str, Any]] = {}
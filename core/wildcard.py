@@ -1,13 +1,70 @@
 import re
+import sys
 from collections.abc import Callable
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
 from typing import Any
 
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 
 from .entry import LoreEntry
 
+# 可解析的键（provider 名 / ResolveView 属性）都是 ASCII 标识符，
+# 非 ASCII 的 {键} 本就原样保留，按 ASCII 语义匹配结果不变
+_WILDCARD_RE = re.compile(r"\{(\w+)\}", re.ASCII)
+
+
+@lru_cache(maxsize=1024)
+def _compile_template(
+    text: str, keys: frozenset[str]
+) -> tuple[str, frozenset[str]] | None:
+    """
+    正文 -> (str.format_map 可用的格式串, 用到的键)（按正文缓存）
+
+    - 已注册的 {键} 保留为占位符
+    - 其余花括号（未知键、JSON 等）全部转义，渲染后原样保留
+    - 没有可替换的占位符时返回 None，调用方直接用原文
+    """
+    parts: list[str] = []
+    used: set[str] = set()
+    pos = 0
+    for m in _WILDCARD_RE.finditer(text):
+        key = m.group(1)
+        if key not in keys:
+            continue
+        parts.append(text[pos : m.start()].replace("{", "{{").replace("}", "}}"))
+        parts.append(m.group(0))
+        used.add(key)
+        pos = m.end()
+    if not used:
+        return None
+    parts.append(text[pos:].replace("{", "{{").replace("}", "}}"))
+    return "".join(parts), frozenset(used)
+
+
+class _WildcardMap(dict):
+    """format_map 用的映射：首次访问某键时才调用 provider，同一次渲染内复用"""
+
+    __slots__ = ("_providers", "_view")
+
+    def __init__(self, providers: dict[str, Callable[[Any], Any]], view: Any):
+        super().__init__()
+        self._providers = providers
+        self._view = view
+
+    def __missing__(self, key: str) -> str:
+        try:
+            val = self._providers[key](self._view)
+        except Exception:
+            # 取值失败时保留原样
+            return "{" + key + "}"
+        val = "" if val is None else str(val)
+        self[key] = val
+        return val
+
+
 # ===== 1) 内置上下文：无参实例化，放“规则/工具/派生逻辑” =====
 
 
@@ -35,7 +92,7 @@ class BuiltinContext:
 # ===== 2) 实时上下文：每次 render 构造，放 entry/event 等 =====
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RuntimeContext:
     entry: LoreEntry
     event: AstrMessageEvent
@@ -51,6 +108,9 @@ class ResolveView:
     - 又能访问 builtin 的内置能力
     """
 
+    # 每次渲染都会构造，省去实例 __dict__
+    __slots__ = ("builtin", "runtime")
+
     def __init__(self, builtin: BuiltinContext, runtime: RuntimeContext):
         self.builtin = builtin
         self.runtime = runtime
@@ -84,16 +144,24 @@ class ResolveView:
 
 
 class WildcardResolver:
-    _pattern = re.compile(r"\{(\w+)\}")
+    # 取值只由 (条目名, 发送者 id, 发送者昵称) 决定的键；
+    # 只用到这些键的正文，渲染结果可按上述三元组缓存（{time} 等易变键不在此列）
+    _STABLE_KEYS = frozenset({"user_id", "user_name", "user", "entry_name"})
+    # 渲染结果缓存上限，超出时整体清空
+    _RENDER_CACHE_SIZE = 1024
 
     def __init__(self):
         self._builtin = BuiltinContext()  # ✅ 无参实例化
         self._providers: dict[str, Callable[[ResolveView], Any]] = {}
         self._register_builtin_providers()
+        self._register_view_properties()
+        self._keys = frozenset(self._providers)
+        # (格式串, 条目名, 发送者 id, 发送者昵称) -> 渲染结果
+        self._rendered: dict[tuple, str] = {}
 
     # 内部注册：不对外暴露
     def _register(self, name: str, provider: Callable[[ResolveView], Any]):
-        self._providers[name] = provider
+        self._providers[sys.intern(name)] = provider
 
     def _register_builtin_providers(self):
         """
@@ -104,39 +172,57 @@ class WildcardResolver:
         """
         # 例：兼容旧写法 {user_name}/{user_id} 其实也可以不注册，
         # 但注册可用于别名/兼容/复杂逻辑。
-        self._register("user_id", lambda v: v.user_id)
-        self._register("user_name", lambda v: v.user_name)
-        self._register("user", lambda v: v.user)
-        self._register("time", lambda v: v.time)
+        self._register("user_id", attrgetter("user_id"))
+        self._register("user_name", attrgetter("user_name"))
+        self._register("user", attrgetter("user"))
+        self._register("time", attrgetter("time"))
 
         # 例：你想加更多内置变量，直接在这里 _register 即可
-        # self._register("entry_name", lambda v: v.entry_name)
+        # self._register("entry_name", attrgetter("entry_name"))
+
+    def _register_view_properties(self):
+        """
+        ResolveView 上的属性也注册为 provider（已注册的同名 provider 优先），
+        render 时只需一次 dict 查找
+        """
+        for name, attr in vars(ResolveView).items():
+            if isinstance(attr, property) and name not in self._providers:
+                self._register(name, attrgetter(name))
 
     def render(self, entry: LoreEntry, event: AstrMessageEvent) -> str:
-        runtime = RuntimeContext(entry=entry, event=event)
-        view = ResolveView(self._builtin, runtime)
         text = entry.content
+        # 没有通配符的正文（大多数）无需扫描
+        if not entry.has_wildcards:
+            return text
+
+        compiled = _compile_template(text, self._keys)
+        if compiled is None:
+            return text
+        template, used = compiled
+
+        cache_key = None
+        if used <= self._STABLE_KEYS:
+            cache_key = (
+                template,
+                entry.name,
+                event.get_sender_id(),
+                event.get_sender_name(),
+            )
+            cached = self._rendered.get(cache_key)
+            if cached is not None:
+                return cached
 
-        def repl(m: re.Match):
-            key = m.group(1)
-
-            # 1) provider 优先（可做兼容/复杂逻辑/别名）
-            fn = self._providers.get(key)
-            if fn is not None:
-                try:
-                    val = fn(view)
-                    return "" if val is None else str(val)
-                except Exception:
-                    return m.group(0)
-
-            # 2) 其次：允许直接读 view 上的属性
-            if hasattr(view, key):
-                try:
-                    val = getattr(view, key)
-                    return "" if val is None else str(val)
-                except Exception:
-                    return m.group(0)
-
-            return m.group(0)
-
-        return self._pattern.sub(repl, text)
+        runtime = RuntimeContext(entry=entry, event=event)
+        view = ResolveView(self._builtin, runtime)
+        # provider（含 ResolveView 属性）可做兼容/复杂逻辑/别名
+        rendered = template.format_map(_WildcardMap(self._providers, view))
+
+        if cache_key is not None:
+            if len(self._rendered) >= self._RENDER_CACHE_SIZE:
+                self._rendered.clear()
+            self._rendered[cache_key] = rendered
+        return rendered
+
+    def clear_cache(self) -> None:
+        """清空渲染结果缓存（插件卸载时调用）"""
+        self._rendered.clear()
@@ -10,7 +10,7 @@ from astrbot.core.star.filter.permission import PermissionType
 
 from .core.config import PluginConfig
 from .core.editor import LoreEditor
-from .core.entry import LoreEntry
+from .core.entry import DecisionCtx, LoreEntry, time_snapshot
 from .core.lorebook import Lorebook
 from .core.scheduler import LoreCronScheduler
 from .core.session import SessionCache
@@ -49,6 +49,9 @@ class WorldBookPlugin(Star):
     async def terminate(self):
         """插件卸载时调用"""
         self.cron.shutdown()
+        await self.share.close()
+        self.wildcards.clear_cache()
+        LoreEntry.clear_pattern_cache()
 
     # ================= 全局态命令 =================
 
@@ -144,50 +147,39 @@ class WorldBookPlugin(Star):
         if not msg:
             return
 
-        umo = event.unified_msg_origin
+        # 发送者身份整个请求只取一次，判决与使用阶段共用
+        ctx = DecisionCtx.from_event(event)
 
-        # Step 1：判决 + 挂载
-        self._decide_entries(event, msg, umo)
+        # 整个请求共用一个时间快照
+        with time_snapshot():
+            # Step 1：判决 + 挂载
+            self._decide_entries(ctx, msg)
 
-        # Step 2：使用会话中的条目
-        self._consume_entries(event, req, umo)
+            # Step 2：使用会话中的条目
+            self._consume_entries(event, req, ctx)
 
-    def _decide_entries(self, event, msg: str, umo: str) -> None:
+    def _decide_entries(self, ctx: DecisionCtx, msg: str) -> None:
         """
         判决与挂载阶段
 
         职责：
-        - 遍历所有可用的 LoreEntry
-        - 通过 LoreEntry.can_activate 做统一判决
+        - 由 Lorebook.match_entries 找出可用的 LoreEntry
+        - 通过 LoreEntry.check_activate 做统一判决
         - 将通过判决的条目写入 Session
         """
 
-        gid = event.get_group_id()
-        uid = event.get_sender_id()
-        is_admin = event.is_admin()
-
-        candidates: list[LoreEntry] = []
-
-        for e in self.lorebook.entries:
-            # 所有是否“允许进入会话”的判断
-            # 必须统一由 LoreEntry.can_activate 给出
-            if e.check_activate(
-                text=msg,
-                user_id=uid,
-                group_id=gid,
-                session_id=umo,
-                is_admin=is_admin,
-            ):
-                candidates.append(e)
+        # 所有是否“允许进入会话”的判断
+        # 必须统一由 LoreEntry.check_activate 给出
+        candidates = self.lorebook.match_entries(msg, ctx)
 
         if not candidates:
             return
 
         # 将通过判决的条目写入 Session
-        self.sessions.attach(umo, candidates)
+        self.sessions.attach(ctx.session_id, candidates)
 
     def _consume_entries(
-        self, event: AstrMessageEvent, req: ProviderRequest, umo: str
+        self, event: AstrMessageEvent, req: ProviderRequest, ctx: DecisionCtx
     ) -> None:
         """
         使用阶段
@@ -200,43 +192,11 @@ class WorldBookPlugin(Star):
         - 记录一次使用消耗
         """
 
-        uid = event.get_sender_id()
-        gid = event.get_group_id()
-        is_admin = event.is_admin()
-
-        # Step 0：取出会话中仍然处于 active 状态的条目（已按 priority 排序）
-        session_entries = self.sessions.get_sorted_active(umo)
-        if not session_entries:
-            return
-
-        # Step 1：使用阶段 scope gate
-        scoped_entries: list[LoreEntry] = []
-        for e in session_entries:
-            if e.allow_consume(
-                user_id=uid,
-                group_id=gid,
-                session_id=umo,
-                is_admin=is_admin,
-            ):
-                scoped_entries.append(e)
-            else:
-                logger.debug(f"[条目:{e.name}] 使用阶段 scope 不满足，已跳过")
-
-        if not scoped_entries:
-            return
-
-        # Step 2：注入数量限制（仅影响本次请求）
-        max_count = self.cfg.max_inject_count
-        inject_entries = scoped_entries
-
-        if max_count > 0 and len(inject_entries) > max_count:
-            dropped = inject_entries[max_count:]
-            logger.debug(
-                f"超出最大允许注入数 {max_count}，"
-                f"已忽略 [{', '.join(e.name for e in dropped)}]"
-            )
-            inject_entries = inject_entries[:max_count]
+        umo = ctx.session_id
 
+        # Step 0-2：取出会话中仍然处于 active 状态的条目（已按 priority 排序），
+        # 经使用阶段 scope gate 后按注入数量限制截断（仅影响本次请求）
+        inject_entries = self.sessions.select(umo, ctx, self.cfg.max_inject_count)
         if not inject_entries:
             return
 
@@ -246,11 +206,15 @@ class WorldBookPlugin(Star):
         sections: list[str] = []
 
         for entry in inject_entries:
-            title = f"## [{entry.name}]"
-            rendered = self.wildcards.render(entry, event)
-            sections.append(f"{title}\n{rendered}")
+            rendered = (
+                self.wildcards.render(entry, event)
+                if entry.has_wildcards
+                else entry.content
+            )
+            sections.append(entry.section_title + rendered)
 
             # 一次注入视为一次使用
             entry.on_consume()
 
-        req.system_prompt += "\n\n" + "\n\n".join(sections) + "\n\n"
+        body = "\n\n".join(sections)
+        req.system_prompt += f"\n\n{body}\n\n"